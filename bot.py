@@ -1,6 +1,13 @@
 import os
+import time
+import asyncio
+import hashlib
 import logging
 import re
+import json
+import signal
+from collections import deque
+from datetime import date
 from dotenv import load_dotenv
 from warnings import filterwarnings
 from telegram.warnings import PTBUserWarning
@@ -12,6 +19,7 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.constants import ParseMode
 from telegram.ext import (
     Application,
+    BaseUpdateProcessor,
     CommandHandler,
     MessageHandler,
     CallbackQueryHandler,
@@ -25,6 +33,8 @@ from langchain.memory import ConversationBufferMemory
 from langchain.chains import ConversationChain
 from langchain.prompts import PromptTemplate
 
+from travel_data import TravelDataGateway, format_flights, format_hotels, format_weather
+
 # Load environment variables
 load_dotenv()
 
@@ -37,6 +47,127 @@ logger = logging.getLogger(__name__)
 # Conversation states
 INITIAL, DESTINATION_DETAILS, RESORT_SELECTION, FLIGHT_OPTIONS, ITINERARY = range(5)
 
+# Prompts sent to the LLM for each button, shared by button_callback and the prefetcher
+CALLBACK_PROMPTS = {
+    "destinations": "Can you tell me more about the Bali destinations you mentioned?",
+    "budget": "I need help planning my budget for this trip.",
+    "questions": "I have some specific questions about travel requirements.",
+    "ubud": "Tell me more about Ubud. Is it safe for families?",
+    "seminyak": "Tell me more about Seminyak. Is it safe for families?",
+    "uluwatu": "Tell me more about Uluwatu. Is it safe for families?",
+    "suggest_ubud_resorts": "Yes, please suggest some resorts in Ubud. We'd prefer family-friendly options.",
+    "suggest_seminyak_resorts": "Yes, please suggest some resorts in Seminyak. We'd prefer family-friendly options.",
+    "suggest_uluwatu_resorts": "Yes, please suggest some resorts in Uluwatu. We'd prefer family-friendly options.",
+    "alila_ubud": "Tell me more about Alila Ubud. What amenities do they offer for families with a child?",
+    "kamandalu": "Tell me more about Kamandalu Ubud. What amenities do they offer for families with a child?",
+    "oberoi": "Tell me more about The Oberoi Beach Resort in Seminyak. What amenities do they offer for families with a child?",
+    "courtyard": "Tell me more about Courtyard by Marriott in Seminyak. What amenities do they offer for families with a child?",
+    "anantara": "Tell me more about Anantara Uluwatu. What amenities do they offer for families with a child?",
+    "bulgari": "Tell me more about Bulgari Resort Bali in Uluwatu. What amenities do they offer for families with a child?",
+    "activities": "What activities are available at this resort or nearby?",
+    "family_activities": "What family-friendly activities are available nearby?",
+    "dining": "What dining options are available at the resort and nearby?",
+    "transportation": "What transportation options are available at the destination?",
+    "book": "I'm ready to book. What information do you need from me?",
+}
+DEFAULT_CALLBACK_PROMPT = "I need more information about my travel options."
+
+def callback_prompt(context, callback_data):
+    """Return the hosting bot's prompt for a button, falling back to the default catalog."""
+    prompts = context.bot_data.get("catalog", {}).get("prompts", {})
+    return prompts.get(callback_data) or CALLBACK_PROMPTS.get(callback_data, DEFAULT_CALLBACK_PROMPT)
+
+def catalog_response(context, key, default=None):
+    """Return the hosting bot's predefined answer for a button or typed request, if it has one."""
+    return context.bot_data.get("catalog", {}).get("responses", {}).get(key, default)
+
+# Buttons answered entirely from predefined text, with nothing to prefetch
+PREDEFINED_CALLBACKS = {"view_flights", "maya_ubud", "w_bali", "six_senses"}
+
+# Speculative prefetch limits
+PREFETCH_MAX_BRANCHES = int(os.getenv("PREFETCH_MAX_BRANCHES", "2"))
+PREFETCH_MAX_CONCURRENCY = int(os.getenv("PREFETCH_MAX_CONCURRENCY", "8"))
+PREFETCH_MAX_PER_MINUTE = int(os.getenv("PREFETCH_MAX_PER_MINUTE", "60"))
+
+# Replies to taps that are dropped instead of processed
+# (taps repeating one that was already answered are acknowledged silently)
+TAP_NOTICES = {
+    "duplicate": "Still working on that, one moment...",
+    "repeat": None,
+    "stale": "That menu is out of date. Please use the latest options.",
+}
+
+# Comma-separated Telegram user ids allowed to use /stats
+ADMIN_USER_IDS = {int(i) for i in os.getenv("ADMIN_USER_IDS", "").replace(" ", "").split(",") if i.isdigit()}
+
+# Model routes: candidate models in order of preference, output budget, and the
+# p95 latency (seconds) above which a model is skipped in favour of the next one
+MODEL_ROUTES = {
+    "quick": {
+        "models": os.getenv("QUICK_MODELS", "gpt-4o-mini,gpt-3.5-turbo").split(","),
+        "max_tokens": int(os.getenv("QUICK_MAX_TOKENS", "600")),
+        "p95_threshold": float(os.getenv("QUICK_P95_THRESHOLD", "8.0")),
+        "timeout": float(os.getenv("QUICK_TIMEOUT", "15.0")),
+    },
+    "itinerary": {
+        "models": os.getenv("ITINERARY_MODELS", "gpt-4o,gpt-4o-mini").split(","),
+        "max_tokens": int(os.getenv("ITINERARY_MAX_TOKENS", "1500")),
+        "p95_threshold": float(os.getenv("ITINERARY_P95_THRESHOLD", "20.0")),
+        "timeout": float(os.getenv("ITINERARY_TIMEOUT", "40.0")),
+    },
+}
+DEFAULT_ROUTE = "quick"
+
+# Route for users over their soft daily token quota
+ECONOMY_ROUTE = "economy"
+MODEL_ROUTES[ECONOMY_ROUTE] = {
+    "models": os.getenv("ECONOMY_MODELS", "gpt-4o-mini").split(","),
+    "max_tokens": int(os.getenv("ECONOMY_MAX_TOKENS", "300")),
+    "p95_threshold": float(os.getenv("ECONOMY_P95_THRESHOLD", "8.0")),
+    "timeout": float(os.getenv("ECONOMY_TIMEOUT", "15.0")),
+}
+
+# First matching rule picks the route for a prompt
+ROUTE_RULES = [
+    ("itinerary", re.compile(r"\b(book|booking|itinerary|schedule|day[- ]by[- ]day)\b", re.IGNORECASE)),
+]
+
+# Latency samples older than this are dropped, so a skipped model gets retried
+ROUTER_WINDOW = float(os.getenv("ROUTER_WINDOW", "300"))
+ROUTER_MIN_SAMPLES = 10
+ROUTER_REPORT_EVERY = int(os.getenv("ROUTER_REPORT_EVERY", "100"))
+
+# Daily token quotas per user (0 disables): past the soft quota turns use the
+# economy route, past the hard quota only predefined catalog answers are given
+DAILY_TOKEN_SOFT_QUOTA = int(os.getenv("DAILY_TOKEN_SOFT_QUOTA", "150000"))
+DAILY_TOKEN_HARD_QUOTA = int(os.getenv("DAILY_TOKEN_HARD_QUOTA", "300000"))
+TOKEN_LEDGER_PATH = os.getenv("TOKEN_LEDGER_PATH", "token_ledger.json")
+TOKEN_LEDGER_FLUSH_INTERVAL = float(os.getenv("TOKEN_LEDGER_FLUSH_INTERVAL", "60"))
+
+# Trip facts extracted into user_data["preferences"] after each turn. Prompts carry
+# these and a running summary, plus only the most recent messages verbatim.
+TRIP_FACTS = ["travel_dates", "party_size", "budget", "destination", "resort", "interests"]
+HISTORY_WINDOW_MESSAGES = int(os.getenv("HISTORY_WINDOW_MESSAGES", "4"))
+DIGEST_BATCH_MESSAGES = int(os.getenv("DIGEST_BATCH_MESSAGES", "4"))
+
+DIGEST_PROMPT = """You maintain notes on a travel planning conversation.
+
+Current trip details (JSON): {facts}
+Current summary: {summary}
+
+New messages:
+{transcript}
+
+Reply with only a JSON object with these keys: {keys}, and "summary".
+Keep known details unless the new messages change them, use null for details still unknown,
+and make "summary" at most three sentences covering what was discussed and decided."""
+
+CATALOG_ONLY_RESPONSE = (
+    "You've reached today's limit for personalized answers. "
+    "You can keep using the menu options for destinations, resorts and flights, "
+    "and full answers will be back tomorrow."
+)
+
 # Function to convert markdown-style formatting to HTML
 def convert_to_html(text):
     # First, remove any existing HTML tags that Telegram doesn't support
@@ -79,14 +210,227 @@ def convert_to_html(text):
             text += f'</{tag}>' * (opening_count - closing_count)
     return text
 
+# Per-user and global token accounting
+class TokenLedger:
+    """Count today's tokens per user and overall, flushing to disk periodically."""
+
+    def __init__(self, path, flush_interval, soft_quota, hard_quota):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.soft_quota = soft_quota
+        self.hard_quota = hard_quota
+        self.day = date.today().isoformat()
+        self.users = {}
+        self.total = {"input_tokens": 0, "output_tokens": 0}
+        self._last_flush = time.monotonic()
+
+    def _roll_over(self):
+        today = date.today().isoformat()
+        if today != self.day:
+            self.day = today
+            self.users = {}
+            self.total = {"input_tokens": 0, "output_tokens": 0}
+
+    def record_call(self, usage):
+        """Add one upstream call's usage to the global count."""
+        self._roll_over()
+        self.total["input_tokens"] += usage["input_tokens"]
+        self.total["output_tokens"] += usage["output_tokens"]
+
+    def record_user(self, user_id, usage):
+        """Charge a turn's usage to the user who received the answer."""
+        self._roll_over()
+        counts = self.users.setdefault(str(user_id), {"input_tokens": 0, "output_tokens": 0})
+        counts["input_tokens"] += usage["input_tokens"]
+        counts["output_tokens"] += usage["output_tokens"]
+        self.maybe_flush()
+
+    def used_today(self, user_id):
+        self._roll_over()
+        counts = self.users.get(str(user_id))
+        return counts["input_tokens"] + counts["output_tokens"] if counts else 0
+
+    def tier(self, user_id):
+        """Return "catalog" or "economy" for users over a quota, else None."""
+        used = self.used_today(user_id)
+        if self.hard_quota and used >= self.hard_quota:
+            return "catalog"
+        if self.soft_quota and used >= self.soft_quota:
+            return "economy"
+        return None
+
+    def snapshot(self):
+        return {
+            "day": self.day,
+            "total": dict(self.total),
+            "users": {user_id: dict(counts) for user_id, counts in self.users.items()},
+        }
+
+    def load(self):
+        """Restore today's counts from the last flush, if any."""
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not load token ledger: {e}")
+            return
+        
+        # Rebuild the counts so a hand-edited or truncated file can't break later turns
+        try:
+            if data.get("day") != date.today().isoformat():
+                return
+            total = {key: int(data["total"][key]) for key in ("input_tokens", "output_tokens")}
+            users = {
+                str(user_id): {key: int(counts[key]) for key in ("input_tokens", "output_tokens")}
+                for user_id, counts in data["users"].items()
+            }
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            logger.warning(f"Ignoring malformed token ledger: {e!r}")
+            return
+        self.day, self.total, self.users = data["day"], total, users
+
+    def _write(self, snapshot):
+        try:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not flush token ledger: {e}")
+
+    def maybe_flush(self):
+        """Write the ledger in the background once the flush interval has passed."""
+        if time.monotonic() - self._last_flush < self.flush_interval:
+            return
+        self._last_flush = time.monotonic()
+        asyncio.get_running_loop().run_in_executor(None, self._write, self.snapshot())
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        self._write(self.snapshot())
+
+    def report(self):
+        over_quota = sum(1 for user_id in self.users if self.tier(user_id))
+        return (
+            f"Tokens today: {self.total['input_tokens']} input / {self.total['output_tokens']} output "
+            f"across {len(self.users)} users, {over_quota} over quota"
+        )
+
+ledger = TokenLedger(
+    TOKEN_LEDGER_PATH, TOKEN_LEDGER_FLUSH_INTERVAL, DAILY_TOKEN_SOFT_QUOTA, DAILY_TOKEN_HARD_QUOTA
+)
+
+# Latency-aware model routing
+class ModelRouter:
+    """Pick a model and output budget per request class, tracking latency and tokens."""
+
+    def __init__(self, routes, rules, default_route):
+        self.routes = routes
+        self.rules = rules
+        self.default_route = default_route
+        self._llms = {}
+        self._latencies = {}
+        self.usage = {name: {"calls": 0, "input_tokens": 0, "output_tokens": 0} for name in routes}
+        self.calls = 0
+
+    def get_llm(self, model, max_tokens, timeout):
+        """Return a shared client for a model, output budget and request timeout."""
+        key = (model, max_tokens, timeout)
+        if key not in self._llms:
+            self._llms[key] = ChatOpenAI(model=model, temperature=0.7, max_tokens=max_tokens, timeout=timeout)
+        return self._llms[key]
+
+    def classify(self, prompt):
+        for route, pattern in self.rules:
+            if pattern.search(prompt):
+                return route
+        return self.default_route
+
+    def _samples(self, route, model):
+        samples = self._latencies.setdefault((route, model), deque())
+        cutoff = time.monotonic() - ROUTER_WINDOW
+        while samples and samples[0][0] < cutoff:
+            samples.popleft()
+        return samples
+
+    def p95(self, route, model):
+        """Return the model's recent p95 latency on a route, or None without enough samples."""
+        samples = self._samples(route, model)
+        if len(samples) < ROUTER_MIN_SAMPLES:
+            return None
+        latencies = sorted(latency for _, latency in samples)
+        return latencies[int(0.95 * (len(latencies) - 1))]
+
+    def select(self, prompt, route=None):
+        """Return the route and client to use for a prompt, unless the route is forced."""
+        route = route or self.classify(prompt)
+        config = self.routes[route]
+        
+        # Take the first model that is within its latency threshold, otherwise the fastest
+        best_model, best_p95 = None, None
+        for model in config["models"]:
+            p95 = self.p95(route, model)
+            if p95 is None or p95 <= config["p95_threshold"]:
+                best_model = model
+                break
+            if best_p95 is None or p95 < best_p95:
+                best_model, best_p95 = model, p95
+        
+        return route, self.get_llm(best_model, config["max_tokens"], config["timeout"])
+
+    def default_llm(self):
+        config = self.routes[self.default_route]
+        return self.get_llm(config["models"][0], config["max_tokens"], config["timeout"])
+
+    async def invoke(self, route, llm, prompt_value):
+        """Call the model, recording latency and token usage for the route."""
+        samples = self._samples(route, llm.model_name)
+        start = time.monotonic()
+        try:
+            message = await llm.ainvoke(prompt_value)
+        except asyncio.CancelledError:
+            # Dropped prefetches and abandoned calls say nothing about the model
+            raise
+        except Exception:
+            # Count a failed call as a timed-out one, so an erroring model is routed around
+            samples.append((time.monotonic(), max(time.monotonic() - start, self.routes[route]["timeout"])))
+            raise
+        samples.append((time.monotonic(), time.monotonic() - start))
+        
+        usage = self.usage[route]
+        usage["calls"] += 1
+        if message.usage_metadata:
+            usage["input_tokens"] += message.usage_metadata["input_tokens"]
+            usage["output_tokens"] += message.usage_metadata["output_tokens"]
+            ledger.record_call(message.usage_metadata)
+        
+        self.calls += 1
+        if self.calls % ROUTER_REPORT_EVERY == 0:
+            logger.info(self.report())
+        return message
+
+    def report(self):
+        """Summarize per-route latency and token usage."""
+        lines = ["Model routing report:"]
+        for route, config in self.routes.items():
+            usage = self.usage[route]
+            latencies = []
+            for model in config["models"]:
+                p95 = self.p95(route, model)
+                latencies.append(f"{model} p95={'n/a' if p95 is None else f'{p95:.2f}s'}")
+            lines.append(
+                f"  {route}: {usage['calls']} calls, {usage['input_tokens']} input / "
+                f"{usage['output_tokens']} output tokens; {', '.join(latencies)}"
+            )
+        return "\n".join(lines)
+
+router = ModelRouter(MODEL_ROUTES, ROUTE_RULES, DEFAULT_ROUTE)
+
 # LLM setup
-def setup_llm():
-    llm = ChatOpenAI(
-        model="gpt-4o-mini",
-        temperature=0.7,
-    )
-    
-    template = """You are a helpful travel agency assistant. You help users plan their vacations by providing information about destinations, accommodations, flights, and activities.
+# Default system prompt; hosted bots can supply their own with the same variables
+PROMPT_TEMPLATE = """You are a helpful travel agency assistant. You help users plan their vacations by providing information about destinations, accommodations, flights, and activities.
 
     Follow this exact conversation flow:
     1. When a user expresses interest in a vacation, ask about:
@@ -121,6 +465,10 @@ def setup_llm():
     {history}
     Human: {input}
     AI Assistant:"""
+
+def setup_llm(template=PROMPT_TEMPLATE):
+    # The chain's own client is only a default; each turn is routed by predict()
+    llm = router.default_llm()
     
     prompt = PromptTemplate(
         input_variables=["history", "input"], 
@@ -137,6 +485,380 @@ def setup_llm():
     
     return conversation
 
+# Single-flight coalescing of identical in-flight LLM calls
+class SingleFlight:
+    """Share one upstream call between concurrent callers using the same key."""
+
+    def __init__(self):
+        self._flights = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def _forget(self, key, task):
+        flight = self._flights.get(key)
+        if flight is not None and flight["task"] is task:
+            del self._flights[key]
+
+    async def do(self, key, func):
+        flight = self._flights.get(key)
+        if flight is None:
+            task = asyncio.ensure_future(func())
+            task.add_done_callback(lambda _: self._forget(key, task))
+            flight = self._flights[key] = {"task": task, "waiters": 0}
+            self.calls += 1
+        else:
+            self.coalesced += 1
+        flight["waiters"] += 1
+        try:
+            # Shield the shared task so one cancelled waiter doesn't cancel it for everyone
+            return await asyncio.shield(flight["task"])
+        finally:
+            flight["waiters"] -= 1
+            # Cancel the upstream call only once nobody is waiting for it anymore
+            if flight["waiters"] == 0 and not flight["task"].done():
+                flight["task"].cancel()
+                self._forget(key, flight["task"])
+
+llm_flights = SingleFlight()
+
+def prompt_key(llm, prompt_text):
+    """Key a request by everything that determines the model's answer."""
+    raw = f"{llm.model_name}|{llm.temperature}|{llm.max_tokens}|{prompt_text}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def format_messages(messages):
+    return "\n".join(
+        f"{'Human' if message.type == 'human' else 'AI'}: {message.content}" for message in messages
+    )
+
+def render_history(user_data, messages):
+    """Render trip facts and summary, plus the messages they don't cover yet."""
+    lines = []
+    preferences = user_data.get("preferences", {})
+    facts = [f"{fact.replace('_', ' ')}: {preferences[fact]}" for fact in TRIP_FACTS if preferences.get(fact)]
+    if facts:
+        lines.append("Known trip details: " + "; ".join(facts))
+    if user_data.get("summary"):
+        lines.append(f"Summary so far: {user_data['summary']}")
+    
+    # Messages not yet digested are always kept verbatim, along with the recent window
+    start = min(user_data.get("digested_upto", 0), max(len(messages) - HISTORY_WINDOW_MESSAGES, 0))
+    if messages[start:]:
+        lines.append(format_messages(messages[start:]))
+    return "\n".join(lines)
+
+class Turn:
+    """A formatted conversation turn and the model it is routed to."""
+
+    def __init__(self, context, prompt, route=None):
+        conversation = context.user_data["conversation"]
+        history = render_history(context.user_data, conversation.memory.chat_memory.messages)
+        self.prompt_value = conversation.prompt.format_prompt(history=history, input=prompt)
+        self.route, self.llm = router.select(prompt, route)
+        self.key = prompt_key(self.llm, self.prompt_value.to_string())
+
+    def call(self):
+        """Run the upstream call, shared with identical in-flight turns."""
+        return llm_flights.do(self.key, lambda: router.invoke(self.route, self.llm, self.prompt_value))
+
+# Speculative prefetch of the answers behind the buttons just shown
+def prefetch_slot(prompt, route, position):
+    """Identify a turn by its input and how many messages preceded it.
+
+    A digest landing in between changes how history is rendered but not what it
+    says, so a prefetch stays valid until another message is added.
+    """
+    return (prompt, route, position)
+
+class Prefetcher:
+    """Precompute likely next turns within a concurrency and per-minute call budget."""
+
+    def __init__(self, max_branches, max_concurrency, max_per_minute):
+        self.max_branches = max_branches
+        self.max_concurrency = max_concurrency
+        self.max_per_minute = max_per_minute
+        self._recent = deque()
+        self.running = 0
+        self.started = 0
+        self.hits = 0
+        self.cancelled = 0
+
+    def _within_budget(self):
+        now = time.monotonic()
+        while self._recent and now - self._recent[0] > 60:
+            self._recent.popleft()
+        return self.running < self.max_concurrency and len(self._recent) < self.max_per_minute
+
+    def _finished(self, task):
+        self.running -= 1
+        # Retrieve the outcome so unused failed prefetches aren't reported as unhandled
+        task.cancelled() or task.exception()
+
+    def schedule(self, update, context, reply_markup):
+        """Start prefetching the turns behind the first few buttons of a keyboard."""
+        conversation = context.user_data.get("conversation")
+        tier = ledger.tier(update.effective_user.id)
+        if conversation is None or tier == "catalog":
+            return
+        route = ECONOMY_ROUTE if tier == "economy" else None
+        
+        # A tap on this keyboard is already waiting to be answered, so prefetching is too late
+        keyboard_id = context.chat_data.get("keyboard_message_id")
+        taps = context.application.update_processor.taps_in_flight(update.effective_chat.id)
+        if any(message_id == keyboard_id for message_id, _ in taps):
+            return
+        
+        # Buttons are listed roughly from most to least likely
+        prompts = []
+        for row in reply_markup.inline_keyboard:
+            for button in row:
+                if button.callback_data in PREDEFINED_CALLBACKS:
+                    continue
+                prompt = callback_prompt(context, button.callback_data)
+                if prompt not in prompts:
+                    prompts.append(prompt)
+        
+        position = len(conversation.memory.chat_memory.messages)
+        pending = context.user_data.setdefault("prefetched", {})
+        for prompt in prompts[:self.max_branches]:
+            slot = prefetch_slot(prompt, route, position)
+            if slot in pending:
+                continue
+            if not self._within_budget():
+                break
+            
+            # Counted from creation, so the budget sees tasks that haven't started yet
+            task = asyncio.ensure_future(Turn(context, prompt, route).call())
+            self.running += 1
+            task.add_done_callback(self._finished)
+            pending[slot] = task
+            self._recent.append(time.monotonic())
+            self.started += 1
+
+    def take(self, context, slot):
+        """Return the prefetch matching this turn and cancel the ones that diverged."""
+        task = context.user_data.get("prefetched", {}).pop(slot, None)
+        self.cancel_all(context)
+        if task is not None:
+            self.hits += 1
+        return task
+
+    def cancel_all(self, context):
+        """Cancel every prefetch still pending for the session."""
+        for task in context.user_data.pop("prefetched", {}).values():
+            if not task.done():
+                task.cancel()
+                self.cancelled += 1
+
+prefetcher = Prefetcher(PREFETCH_MAX_BRANCHES, PREFETCH_MAX_CONCURRENCY, PREFETCH_MAX_PER_MINUTE)
+
+# Button taps processed, and taps dropped as duplicates or from stale keyboards
+tap_stats = {"processed": 0, "duplicate": 0, "repeat": 0, "stale": 0}
+
+async def predict(update, context, prompt):
+    """Run one conversation turn, reusing a prefetched or identical in-flight LLM call."""
+    user_id = update.effective_user.id
+    tier = ledger.tier(user_id)
+    if tier == "catalog":
+        return CATALOG_ONLY_RESPONSE
+    
+    conversation = context.user_data["conversation"]
+    route = ECONOMY_ROUTE if tier == "economy" else None
+    
+    message = None
+    slot = prefetch_slot(prompt, route, len(conversation.memory.chat_memory.messages))
+    task = prefetcher.take(context, slot)
+    if task is not None:
+        try:
+            message = await task
+        except Exception as e:
+            logger.warning(f"Prefetched answer failed, retrying: {e}")
+    if message is None:
+        message = await Turn(context, prompt, route).call()
+    
+    # Every waiter records the turn in its own conversation memory and ledger entry
+    conversation.memory.save_context({"input": prompt}, {"response": message.content})
+    if message.usage_metadata:
+        ledger.record_user(user_id, message.usage_metadata)
+    
+    schedule_digest(update, context)
+    return message.content
+
+# Background extraction of trip facts and a running summary, off the reply path
+digest_stats = {"runs": 0, "failed": 0}
+
+def parse_digest(text):
+    """Pull the JSON object out of a digest reply."""
+    match = re.search(r"\{.*\}", text, flags=re.DOTALL)
+    if not match:
+        raise ValueError("no JSON object in digest reply")
+    return json.loads(match.group(0))
+
+async def digest_conversation(update, context):
+    """Fold undigested messages into the session's trip facts and summary."""
+    user_data = context.user_data
+    messages = user_data["conversation"].memory.chat_memory.messages
+    upto = len(messages)
+    preferences = user_data.setdefault("preferences", {})
+    
+    prompt = DIGEST_PROMPT.format(
+        facts=json.dumps({fact: preferences.get(fact) for fact in TRIP_FACTS}),
+        summary=user_data.get("summary") or "(none yet)",
+        transcript=format_messages(messages[user_data.get("digested_upto", 0):upto]),
+        keys=", ".join(f'"{fact}"' for fact in TRIP_FACTS),
+    )
+    route, llm = router.select(prompt, ECONOMY_ROUTE)
+    try:
+        message = await router.invoke(route, llm, prompt)
+        data = parse_digest(message.content)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        digest_stats["failed"] += 1
+        logger.warning(f"Conversation digest failed: {e}")
+        return
+    
+    if message.usage_metadata:
+        ledger.record_user(update.effective_user.id, message.usage_metadata)
+    for fact in TRIP_FACTS:
+        if data.get(fact):
+            preferences[fact] = str(data[fact])
+    if data.get("summary"):
+        user_data["summary"] = str(data["summary"])
+    user_data["digested_upto"] = upto
+    digest_stats["runs"] += 1
+
+def schedule_digest(update, context):
+    """Start a digest after a typed message, or once enough messages have piled up."""
+    user_data = context.user_data
+    pending = user_data.get("digest_task")
+    if pending is not None and not pending.done():
+        return
+    
+    messages = user_data["conversation"].memory.chat_memory.messages
+    undigested = len(messages) - user_data.get("digested_upto", 0)
+    if update.message is None and undigested < DIGEST_BATCH_MESSAGES:
+        return
+    user_data["digest_task"] = asyncio.ensure_future(digest_conversation(update, context))
+
+# Application lifecycle. The gateway, like the model router, response coalescing,
+# prefetch budget and token ledger, is shared by every bot hosted in the process.
+travel_data_gateway = None
+
+async def start_shared_services() -> None:
+    """Restore today's token ledger and create the travel data gateway."""
+    global travel_data_gateway
+    ledger.load()
+    travel_data_gateway = TravelDataGateway()
+
+async def stop_shared_services() -> None:
+    """Close the gateway's connection pool and persist the token ledger."""
+    await travel_data_gateway.close()
+    ledger.flush()
+
+async def post_init(application: Application) -> None:
+    await start_shared_services()
+
+async def post_shutdown(application: Application) -> None:
+    await stop_shared_services()
+
+# Live travel data
+async def fetch_travel_data(source, destination):
+    """Fetch the one source a reply shows, warming the others' caches in the background."""
+    if travel_data_gateway is None:
+        return None
+    travel_data_gateway.warm(destination, [name for name in travel_data_gateway.sources if name != source])
+    return await travel_data_gateway.fetch(source, destination)
+
+async def reply_with_keyboard(update, context, response, reply_markup):
+    """Reply with a keyboard, make it the chat's live keyboard and prefetch its answers."""
+    sent = await update.effective_message.reply_text(response, reply_markup=reply_markup, parse_mode=ParseMode.HTML)
+    context.chat_data["keyboard_message_id"] = sent.message_id
+    prefetcher.schedule(update, context, reply_markup)
+    return sent
+
+def add_before_question(response, section):
+    """Insert a section ahead of the closing question of a predefined response."""
+    if "\n\n" not in response:
+        # A single-paragraph response, e.g. from a catalog, just gets it appended
+        return f"{response}\n\n{section}"
+    body, question = response.rsplit("\n\n", 1)
+    return f"{body}\n\n{section}\n\n{question}"
+
+# Session state forgotten when a trip is started over or cancelled
+SESSION_KEYS = [
+    "conversation", "preferences", "summary", "digested_upto", "previous_message",
+    "selected_destination", "selected_resort", "last_response",
+]
+
+def reset_session(context):
+    """Forget the current trip and stop any background work still running for it."""
+    prefetcher.cancel_all(context)
+    digest = context.user_data.pop("digest_task", None)
+    if digest is not None and not digest.done():
+        digest.cancel()
+    for key in SESSION_KEYS:
+        context.user_data.pop(key, None)
+
+# Updates from different chats are processed concurrently so their LLM calls overlap
+# (and identical ones coalesce), while each chat's updates run one at a time and in
+# order, so the conversation handler always routes on the state the previous one left
+class PerChatUpdateProcessor(BaseUpdateProcessor):
+    """Process one update at a time per chat, and different chats in parallel.
+
+    A button tap repeating one that is still queued or being answered is acknowledged
+    right away and dropped, rather than waiting its turn behind the first.
+    """
+
+    def __init__(self, max_concurrent_updates):
+        super().__init__(max_concurrent_updates)
+        self._locks = {}
+        self._queued = {}
+        self._taps = {}
+
+    def taps_in_flight(self, chat_id):
+        """Return the (message id, callback data) taps queued or running in a chat."""
+        return self._taps.get(chat_id, set())
+
+    async def do_process_update(self, update, coroutine):
+        chat = update.effective_chat if isinstance(update, Update) else None
+        if chat is None:
+            await coroutine
+            return
+        
+        query = update.callback_query
+        tap = (query.message.message_id, query.data) if query and query.message else None
+        if tap is not None and tap in self.taps_in_flight(chat.id):
+            coroutine.close()
+            tap_stats["duplicate"] += 1
+            await query.answer(TAP_NOTICES["duplicate"])
+            return
+        
+        lock = self._locks.setdefault(chat.id, asyncio.Lock())
+        self._queued[chat.id] = self._queued.get(chat.id, 0) + 1
+        if tap is not None:
+            self._taps.setdefault(chat.id, set()).add(tap)
+        try:
+            async with lock:
+                await coroutine
+        finally:
+            # Forget the chat's lock and taps once it has nothing queued
+            self._queued[chat.id] -= 1
+            if tap is not None:
+                self._taps[chat.id].discard(tap)
+            if not self._queued[chat.id]:
+                del self._queued[chat.id], self._locks[chat.id]
+                self._taps.pop(chat.id, None)
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+# Process updates from up to this many chats at once
+MAX_CONCURRENT_UPDATES = int(os.getenv("MAX_CONCURRENT_UPDATES", "256"))
+
 # Command handlers
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Send a message when the command /start is issued."""
@@ -147,8 +869,9 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
         parse_mode=ParseMode.HTML
     )
     
-    # Initialize conversation memory in context
-    context.user_data["conversation"] = setup_llm()
+    # Start a fresh session with new conversation memory
+    reset_session(context)
+    context.user_data["conversation"] = setup_llm(context.bot_data.get("prompt_template", PROMPT_TEMPLATE))
     
     return INITIAL
 
@@ -161,8 +884,23 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         parse_mode=ParseMode.HTML
     )
 
+async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Report how much LLM work the bot is saving, for admins only."""
+    if update.effective_user.id not in ADMIN_USER_IDS:
+        return
+    await update.message.reply_text(
+        f"{router.report()}\n"
+        f"{ledger.report()}\n"
+        f"Upstream calls: {llm_flights.calls}, coalesced: {llm_flights.coalesced}\n"
+        f"Prefetches: {prefetcher.started} started, {prefetcher.hits} used, {prefetcher.cancelled} cancelled\n"
+        f"Digests: {digest_stats['runs']} run, {digest_stats['failed']} failed\n"
+        f"Taps: {tap_stats['processed']} processed, {tap_stats['duplicate']} duplicate, "
+        f"{tap_stats['repeat']} repeat, {tap_stats['stale']} stale"
+    )
+
 async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Cancel and end the conversation."""
+    reset_session(context)
     await update.message.reply_text(
         "Your travel planning session has been cancelled. "
         "Feel free to start a new one anytime with /start.",
@@ -174,11 +912,8 @@ async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
 async def handle_initial_query(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Handle the user's initial vacation query."""
     user_message = update.message.text
-    conversation = context.user_data.get("conversation")
-    
-    if not conversation:
-        context.user_data["conversation"] = setup_llm()
-        conversation = context.user_data["conversation"]
+    if not context.user_data.get("conversation"):
+        context.user_data["conversation"] = setup_llm(context.bot_data.get("prompt_template", PROMPT_TEMPLATE))
     
     # Check if this is likely an initial vacation inquiry
     initial_vacation_keywords = ["vacation", "trip", "travel", "holiday", "beach", "plan", "looking"]
@@ -192,11 +927,13 @@ async def handle_initial_query(update: Update, context: ContextTypes.DEFAULT_TYP
                    "• Do you have any specific areas in Bali in mind?\n"
                    "• What's your approximate budget range for this trip?")
         
+        response = catalog_response(context, "initial", response)
+        
         # Add this to the conversation memory
-        conversation.predict(input=user_message)
+        await predict(update, context, user_message)
     else:
         # Get response from LLM for other queries
-        response = conversation.predict(input=user_message)
+        response = await predict(update, context, user_message)
     
     # Convert any remaining markdown to HTML
     response = convert_to_html(response)
@@ -205,9 +942,7 @@ async def handle_initial_query(update: Update, context: ContextTypes.DEFAULT_TYP
     context.user_data["last_response"] = response
     
     # Store user preferences in context
-    context.user_data["preferences"] = {
-        "query": user_message,
-    }
+    context.user_data.setdefault("preferences", {})["query"] = user_message
     
     # Send response with follow-up options
     keyboard = [
@@ -217,13 +952,12 @@ async def handle_initial_query(update: Update, context: ContextTypes.DEFAULT_TYP
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
     
-    await update.message.reply_text(response, reply_markup=reply_markup, parse_mode=ParseMode.HTML)
+    await reply_with_keyboard(update, context, response, reply_markup)
     return DESTINATION_DETAILS
 
 async def handle_destination_details(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Handle queries about destination details."""
     user_message = update.message.text
-    conversation = context.user_data.get("conversation")
     
     # Check if this message contains travel details (dates, people, budget)
     travel_detail_keywords = ["june", "july", "august", "adult", "child", "kid", "budget", "$", "dollar", "week"]
@@ -237,11 +971,13 @@ async def handle_destination_details(update: Update, context: ContextTypes.DEFAU
                    "<b>3. Uluwatu</b> - Dramatic clifftop location with luxury resorts and famous temples\n\n"
                    "Would you like more information about any of these destinations? Or do you have other preferences I should consider?")
         
+        response = catalog_response(context, "destinations_overview", response)
+        
         # Add this to the conversation memory
-        conversation.predict(input=user_message)
+        await predict(update, context, user_message)
     else:
         # Get response from LLM for other queries
-        response = conversation.predict(input=user_message)
+        response = await predict(update, context, user_message)
     
     # Convert any remaining markdown to HTML
     response = convert_to_html(response)
@@ -262,16 +998,15 @@ async def handle_destination_details(update: Update, context: ContextTypes.DEFAU
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
     
-    await update.message.reply_text(response, reply_markup=reply_markup, parse_mode=ParseMode.HTML)
+    await reply_with_keyboard(update, context, response, reply_markup)
     return RESORT_SELECTION
 
 async def handle_resort_selection(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Handle resort selection queries."""
     user_message = update.message.text
-    conversation = context.user_data.get("conversation")
     
     # Get response from LLM
-    response = conversation.predict(input=user_message)
+    response = await predict(update, context, user_message)
     
     # Convert any remaining markdown to HTML
     response = convert_to_html(response)
@@ -300,16 +1035,15 @@ async def handle_resort_selection(update: Update, context: ContextTypes.DEFAULT_
         ]
     
     reply_markup = InlineKeyboardMarkup(keyboard)
-    await update.message.reply_text(response, reply_markup=reply_markup, parse_mode=ParseMode.HTML)
+    await reply_with_keyboard(update, context, response, reply_markup)
     return FLIGHT_OPTIONS
 
 async def handle_flight_options(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Handle flight option queries."""
     user_message = update.message.text
-    conversation = context.user_data.get("conversation")
     
     # Get response from LLM
-    response = conversation.predict(input=user_message)
+    response = await predict(update, context, user_message)
     
     # Convert any remaining markdown to HTML
     response = convert_to_html(response)
@@ -324,16 +1058,15 @@ async def handle_flight_options(update: Update, context: ContextTypes.DEFAULT_TY
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
     
-    await update.message.reply_text(response, reply_markup=reply_markup, parse_mode=ParseMode.HTML)
+    await reply_with_keyboard(update, context, response, reply_markup)
     return ITINERARY
 
 async def handle_itinerary(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Handle itinerary and activity queries."""
     user_message = update.message.text
-    conversation = context.user_data.get("conversation")
     
     # Get response from LLM
-    response = conversation.predict(input=user_message)
+    response = await predict(update, context, user_message)
     
     # Convert any remaining markdown to HTML
     response = convert_to_html(response)
@@ -350,17 +1083,45 @@ async def handle_itinerary(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
     
-    await update.message.reply_text(response, reply_markup=reply_markup, parse_mode=ParseMode.HTML)
+    await reply_with_keyboard(update, context, response, reply_markup)
     return ITINERARY
 
 # Callback query handlers
+# (taps repeating one still in flight are dropped by PerChatUpdateProcessor)
+def classify_tap(context, query):
+    """Return "repeat" or "stale" for taps that needn't be processed, else None."""
+    tap = (query.message.message_id, query.data)
+    if tap == context.chat_data.get("last_callback"):
+        return "repeat"
+    
+    # Only the most recent keyboard sent to the chat is live
+    keyboard_id = context.chat_data.get("keyboard_message_id")
+    if keyboard_id is not None and query.message.message_id != keyboard_id:
+        return "stale"
+    return None
+
 async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    """Handle button callbacks."""
+    """Handle button callbacks, skipping repeated taps and taps on old keyboards."""
     query = update.callback_query
-    await query.answer()
     
+    skipped = classify_tap(context, query)
+    if skipped:
+        # Acknowledge without any LLM work; None keeps the conversation state unchanged
+        tap_stats[skipped] += 1
+        await query.answer(TAP_NOTICES[skipped])
+        return None
+    
+    await query.answer()
+    tap_stats["processed"] += 1
+    state = await answer_button(update, context)
+    # Only a successful tap is remembered, so a failed one can be retried
+    context.chat_data["last_callback"] = (query.message.message_id, query.data)
+    return state
+
+async def answer_button(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Answer a button tap."""
+    query = update.callback_query
     callback_data = query.data
-    conversation = context.user_data.get("conversation")
     
     # Store the previous message for multi-turn conversation memory
     if "previous_message" not in context.user_data:
@@ -368,13 +1129,13 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     
     # Dynamic Knowledge Retrieval scenario
     if callback_data == "destinations":
-        prompt = "Can you tell me more about the Bali destinations you mentioned?"
+        prompt = callback_prompt(context, "destinations")
         context.user_data["previous_message"].append("Tell me more about Bali destinations")
     elif callback_data == "budget":
-        prompt = "I need help planning my budget for this trip."
+        prompt = callback_prompt(context, "budget")
         context.user_data["previous_message"].append("I need help planning my budget")
     elif callback_data == "questions":
-        prompt = "I have some specific questions about travel requirements."
+        prompt = callback_prompt(context, "questions")
         context.user_data["previous_message"].append("I have questions about travel requirements")
     elif callback_data in ["ubud", "seminyak", "uluwatu"]:
         context.user_data["selected_destination"] = callback_data
@@ -382,8 +1143,8 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         
         # Dynamic Knowledge Retrieval scenario - detailed information about destinations
         if callback_data == "ubud":
-            prompt = "Tell me more about Ubud. Is it safe for families?"
-            context.user_data["previous_message"].append("Tell me more about Ubud. Is it safe for families?")
+            prompt = callback_prompt(context, "ubud")
+            context.user_data["previous_message"].append(prompt)
             response = ("<b>Ubud, Bali</b> is generally considered safe for families and is one of Bali's most popular cultural destinations. Here's what you should know:\n\n"
                        "<b>Safety:</b> Ubud is very safe for tourists and families. The local community is friendly and welcoming to children. As with any destination, basic precautions are recommended.\n\n"
                        "<b>Family Activities:</b>\n"
@@ -395,8 +1156,8 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
                        "<b>Travel Requirements:</b> You'll need passports for everyone, including your child. Most visitors can get a 30-day visa on arrival in Bali.\n\n"
                        "Would you like me to recommend some specific family-friendly resorts in Ubud that fit your budget?")
         elif callback_data == "seminyak":
-            prompt = "Tell me more about Seminyak. Is it safe for families?"
-            context.user_data["previous_message"].append("Tell me more about Seminyak. Is it safe for families?")
+            prompt = callback_prompt(context, "seminyak")
+            context.user_data["previous_message"].append(prompt)
             response = ("<b>Seminyak, Bali</b> is generally considered safe for families and is one of Bali's most popular beach areas. Here's what you should know:\n\n"
                        "<b>Safety:</b> The resort areas are well-patrolled and secure. Be cautious with children at the beach as some areas have strong currents. As with any destination, basic precautions are recommended.\n\n"
                        "<b>Family Activities:</b>\n"
@@ -408,8 +1169,8 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
                        "<b>Travel Requirements:</b> You'll need passports for everyone, including your child. Most visitors can get a 30-day visa on arrival in Bali.\n\n"
                        "Would you like me to recommend some specific family-friendly resorts in Seminyak that fit your budget?")
         else:  # uluwatu
-            prompt = "Tell me more about Uluwatu. Is it safe for families?"
-            context.user_data["previous_message"].append("Tell me more about Uluwatu. Is it safe for families?")
+            prompt = callback_prompt(context, "uluwatu")
+            context.user_data["previous_message"].append(prompt)
             response = ("<b>Uluwatu, Bali</b> is generally considered safe for families, though it's better suited for families with older children. Here's what you should know:\n\n"
                        "<b>Safety:</b> The resort areas are secure, but be cautious near cliff edges with children. Many beaches have strong currents and are better for watching surfers than swimming. As with any destination, basic precautions are recommended.\n\n"
                        "<b>Family Activities:</b>\n"
@@ -421,8 +1182,18 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
                        "<b>Travel Requirements:</b> You'll need passports for everyone, including your child. Most visitors can get a 30-day visa on arrival in Bali.\n\n"
                        "Would you like me to recommend some specific family-friendly resorts in Uluwatu that fit your budget?")
         
-        # Add this to the conversation memory
-        conversation.predict(input=prompt)
+        response = catalog_response(context, callback_data, response)
+        
+        # Add this to the conversation memory while live data for the destination loads
+        _, weather = await asyncio.gather(
+            predict(update, context, prompt),
+            fetch_travel_data("weather", callback_data),
+        )
+        if weather:
+            response = add_before_question(
+                response,
+                f"<b>Current weather:</b> {format_weather(weather)}"
+            )
         
         # Store the response in user_data for error handling
         context.user_data["last_response"] = response
@@ -448,7 +1219,7 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             ]
         
         reply_markup = InlineKeyboardMarkup(keyboard)
-        await query.message.reply_text(response, reply_markup=reply_markup, parse_mode=ParseMode.HTML)
+        await reply_with_keyboard(update, context, response, reply_markup)
         return RESORT_SELECTION
     
     # Multi-Turn Conversation with Memory scenario
@@ -508,10 +1279,20 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
                            "• Leaves significant room in your budget for flights and extras\n\n"
                            "Would you like more specific details about any of these options? Or would you prefer to explore different destinations?")
             
+            response = catalog_response(context, callback_data, response)
+            
             # Add to conversation memory
-            prompt = f"Yes, please suggest some resorts in {destination}. We'd prefer family-friendly options."
+            prompt = callback_prompt(context, callback_data)
             context.user_data["previous_message"].append(prompt)
-            conversation.predict(input=prompt)
+            _, hotels = await asyncio.gather(
+                predict(update, context, prompt),
+                fetch_travel_data("hotels", destination.lower()),
+            )
+            if hotels:
+                response = add_before_question(
+                    response,
+                    f"<b>Current rates:</b>\n{format_hotels(hotels)}"
+                )
             
             # Store the response in user_data for error handling
             context.user_data["last_response"] = response
@@ -524,7 +1305,7 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             ]
             
             reply_markup = InlineKeyboardMarkup(keyboard)
-            await query.message.reply_text(response, reply_markup=reply_markup, parse_mode=ParseMode.HTML)
+            await reply_with_keyboard(update, context, response, reply_markup)
             return RESORT_SELECTION
     
     # Rest of the function remains the same
@@ -534,7 +1315,9 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         await query.edit_message_text(text=f"You selected: {resort_name}", parse_mode=ParseMode.HTML)
         
         # Use predefined responses for specific resorts to match the exact flow
-        if callback_data == "maya_ubud":
+        if catalog_response(context, callback_data):
+            response = catalog_response(context, callback_data)
+        elif callback_data == "maya_ubud":
             prompt = "Tell me more about Maya Ubud Resort. What amenities do they offer for families?"
             response = ("<b>Maya Ubud Resort & Spa - $2,100 total</b>\n\n"
                        "This is an excellent choice for families! Here are the details:\n\n"
@@ -584,20 +1367,8 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
                        "At $2,800 for your 7-night stay, this is at the higher end of your $3,000 budget but offers exceptional value. Would you like to know about flight options from your location?")
         else:
             # For other resorts, use the LLM
-            if callback_data == "alila_ubud":
-                prompt = f"Tell me more about Alila Ubud. What amenities do they offer for families with a child?"
-            elif callback_data == "kamandalu":
-                prompt = f"Tell me more about Kamandalu Ubud. What amenities do they offer for families with a child?"
-            elif callback_data == "oberoi":
-                prompt = f"Tell me more about The Oberoi Beach Resort in Seminyak. What amenities do they offer for families with a child?"
-            elif callback_data == "courtyard":
-                prompt = f"Tell me more about Courtyard by Marriott in Seminyak. What amenities do they offer for families with a child?"
-            elif callback_data == "anantara":
-                prompt = f"Tell me more about Anantara Uluwatu. What amenities do they offer for families with a child?"
-            elif callback_data == "bulgari":
-                prompt = f"Tell me more about Bulgari Resort Bali in Uluwatu. What amenities do they offer for families with a child?"
-            
-            response = conversation.predict(input=prompt)
+            prompt = callback_prompt(context, callback_data)
+            response = await predict(update, context, prompt)
             response = convert_to_html(response)
         
         # Store the response in user_data for error handling
@@ -608,7 +1379,7 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             [InlineKeyboardButton("Explore activities", callback_data="activities")],
         ]
         reply_markup = InlineKeyboardMarkup(keyboard)
-        await query.message.reply_text(response, reply_markup=reply_markup, parse_mode=ParseMode.HTML)
+        await reply_with_keyboard(update, context, response, reply_markup)
         return FLIGHT_OPTIONS
     
     elif callback_data in ["view_flights", "activities", "family_activities", "dining", "transportation", "book"]:
@@ -677,8 +1448,21 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
                            "2. Look at alternative accommodations that are more budget-friendly\n"
                            "3. Consider a destination closer to home\n"
                            "4. Extend your budget for this special trip")
+            
+            # A hosting bot's own flight answer is used as is
+            catalog = catalog_response(context, callback_data)
+            if catalog is not None:
+                response = catalog
+            else:
+                # Add live fares when the flight source is available
+                flights = await fetch_travel_data("flights", destination)
+                if flights:
+                    response = add_before_question(
+                        response,
+                        f"<b>Current fares:</b>\n{format_flights(flights)}"
+                    )
         elif callback_data == "activities":
-            prompt = "What activities are available at this resort or nearby?"
+            prompt = callback_prompt(context, "activities")
             
             # Get the selected destination and resort
             destination = context.user_data.get("selected_destination", "")
@@ -708,23 +1492,23 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
                            "• Scooter rental (not recommended with young children)")
             else:
                 # For other resorts, use the LLM
-                response = conversation.predict(input=prompt)
+                response = await predict(update, context, prompt)
                 response = convert_to_html(response)
         elif callback_data == "family_activities":
-            prompt = "What family-friendly activities are available nearby?"
-            response = conversation.predict(input=prompt)
+            prompt = callback_prompt(context, "family_activities")
+            response = await predict(update, context, prompt)
             response = convert_to_html(response)
         elif callback_data == "dining":
-            prompt = "What dining options are available at the resort and nearby?"
-            response = conversation.predict(input=prompt)
+            prompt = callback_prompt(context, "dining")
+            response = await predict(update, context, prompt)
             response = convert_to_html(response)
         elif callback_data == "transportation":
-            prompt = "What transportation options are available at the destination?"
-            response = conversation.predict(input=prompt)
+            prompt = callback_prompt(context, "transportation")
+            response = await predict(update, context, prompt)
             response = convert_to_html(response)
         else:  # book
-            prompt = "I'm ready to book. What information do you need from me?"
-            response = conversation.predict(input=prompt)
+            prompt = callback_prompt(context, "book")
+            response = await predict(update, context, prompt)
             response = convert_to_html(response)
         
         await query.edit_message_text(text=f"You selected: {callback_data.replace('_', ' ').title()}", parse_mode=ParseMode.HTML)
@@ -737,14 +1521,14 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             [InlineKeyboardButton("Ready to book", callback_data="ready_to_book")],
         ]
         reply_markup = InlineKeyboardMarkup(keyboard)
-        await query.message.reply_text(response, reply_markup=reply_markup, parse_mode=ParseMode.HTML)
+        await reply_with_keyboard(update, context, response, reply_markup)
         return ITINERARY
     
     else:
-        prompt = "I need more information about my travel options."
+        prompt = callback_prompt(context, callback_data)
     
     # Get response from LLM for the constructed prompt
-    response = conversation.predict(input=prompt)
+    response = await predict(update, context, prompt)
     
     # Convert any remaining markdown to HTML
     response = convert_to_html(response)
@@ -788,10 +1572,16 @@ async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         except Exception as e:
             logger.error(f"Error in error handler: {e}")
 
-def main() -> None:
-    """Start the bot."""
-    # Create the Application
-    application = Application.builder().token(os.getenv("TELEGRAM_BOT_TOKEN")).build()
+def build_application(token, prompt_template=PROMPT_TEMPLATE, catalog=None, builder=None) -> Application:
+    """Create a bot application with the travel conversation flow."""
+    application = (
+        (builder or Application.builder())
+        .token(token)
+        .concurrent_updates(PerChatUpdateProcessor(MAX_CONCURRENT_UPDATES))
+        .build()
+    )
+    application.bot_data["prompt_template"] = prompt_template
+    application.bot_data["catalog"] = catalog or {}
 
     # Create conversation handler with the states
     conv_handler = ConversationHandler(
@@ -824,9 +1614,88 @@ def main() -> None:
 
     application.add_handler(conv_handler)
     application.add_handler(CommandHandler("help", help_command))
+    application.add_handler(CommandHandler("stats", stats_command))
     
     # Register the error handler
     application.add_error_handler(error_handler)
+    
+    return application
+
+def load_bot_configs(path):
+    """Read the hosted bots from a JSON config file.
+
+    Each entry names the environment variable holding its token ("token_env") and
+    may point to its own prompt template ("prompt_template", a text file) and
+    content catalog ("catalog", a JSON file with "prompts" and "responses" keyed
+    by button, plus "initial" and "destinations_overview" for the answers to typed
+    trip requests). Relative paths are resolved against the config file.
+    """
+    base_dir = os.path.dirname(os.path.abspath(path))
+    with open(path) as f:
+        config = json.load(f)
+    
+    bots = []
+    for entry in config["bots"]:
+        token = os.getenv(entry["token_env"])
+        if not token:
+            raise ValueError(f"Bot {entry['name']!r}: {entry['token_env']} is not set")
+        
+        prompt_template = PROMPT_TEMPLATE
+        if entry.get("prompt_template"):
+            with open(os.path.join(base_dir, entry["prompt_template"])) as f:
+                prompt_template = f.read()
+            if "{history}" not in prompt_template or "{input}" not in prompt_template:
+                raise ValueError(f"Bot {entry['name']!r}: prompt template needs {{history}} and {{input}}")
+        
+        catalog = {}
+        if entry.get("catalog"):
+            with open(os.path.join(base_dir, entry["catalog"])) as f:
+                catalog = json.load(f)
+        
+        bots.append({"name": entry["name"], "token": token, "prompt_template": prompt_template, "catalog": catalog})
+    return bots
+
+async def run_bots(bots) -> None:
+    """Poll several bots in one event loop until interrupted."""
+    applications = [
+        build_application(bot["token"], bot["prompt_template"], bot["catalog"])
+        for bot in bots
+    ]
+    
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    
+    await start_shared_services()
+    started = []
+    try:
+        for bot, application in zip(bots, applications):
+            await application.initialize()
+            await application.start()
+            await application.updater.start_polling(allowed_updates=Update.ALL_TYPES)
+            started.append(application)
+            logger.info(f"Bot {bot['name']!r} started as @{application.bot.username}")
+        await stop.wait()
+    finally:
+        for application in reversed(started):
+            await application.updater.stop()
+            await application.stop()
+            await application.shutdown()
+        await stop_shared_services()
+
+def main() -> None:
+    """Start the bot, or every bot listed in BOTS_CONFIG."""
+    bots_config = os.getenv("BOTS_CONFIG")
+    if bots_config:
+        asyncio.run(run_bots(load_bot_configs(bots_config)))
+        return
+    
+    # Create the Application
+    application = build_application(
+        os.getenv("TELEGRAM_BOT_TOKEN"),
+        builder=Application.builder().post_init(post_init).post_shutdown(post_shutdown),
+    )
 
     # Start the Bot
     application.run_polling(allowed_updates=Update.ALL_TYPES)
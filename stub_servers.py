@@ -0,0 +1,116 @@
+"""Local stand-ins for the flight, hotel and weather APIs.
+
+Run `python stub_servers.py` and point the bot at them to exercise the travel data
+gateway offline:
+
+    SKYSCANNER_BASE_URL=http://127.0.0.1:8701
+    BOOKING_BASE_URL=http://127.0.0.1:8702
+    OPENWEATHERMAP_BASE_URL=http://127.0.0.1:8703
+    OPENWEATHERMAP_API_KEY=stub
+
+Set FLIGHTS_STUB_DELAY, HOTELS_STUB_DELAY or WEATHER_STUB_DELAY (seconds) to
+simulate a slow source.
+"""
+import os
+import json
+import asyncio
+import logging
+from urllib.parse import urlsplit, parse_qs
+
+logging.basicConfig(
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+FLIGHTS = [
+    {"airline": "Singapore Airlines", "price": 1250, "stops": "1 stop in Singapore",
+     "depart": "1:15 PM", "arrive": "11:45 PM (next day)"},
+    {"airline": "Qatar Airways", "price": 1320, "stops": "1 stop in Doha",
+     "depart": "8:15 PM", "arrive": "10:20 PM (next day)"},
+    {"airline": "Cathay Pacific", "price": 1180, "stops": "1 stop in Hong Kong",
+     "depart": "3:40 PM", "arrive": "1:15 AM (+2 days)"},
+]
+
+HOTELS = {
+    "ubud": [
+        {"name": "Maya Ubud Resort & Spa", "price_total": 2100},
+        {"name": "Kamandalu Ubud", "price_total": 1850},
+        {"name": "Alila Ubud", "price_total": 1650},
+    ],
+    "seminyak": [
+        {"name": "W Bali - Seminyak", "price_total": 2450},
+        {"name": "Courtyard by Marriott Bali Seminyak", "price_total": 1950},
+        {"name": "Bali Mandira Beach Resort", "price_total": 1750},
+    ],
+    "uluwatu": [
+        {"name": "Six Senses Uluwatu", "price_total": 2800},
+        {"name": "Anantara Uluwatu", "price_total": 2400},
+        {"name": "Radisson Blu Uluwatu", "price_total": 1950},
+    ],
+}
+
+def flights(params):
+    return {"flights": FLIGHTS}
+
+def hotels(params):
+    return {"hotels": HOTELS.get(params.get("area", ""), [])}
+
+def weather(params):
+    return {"main": {"temp": 82.4}, "weather": [{"description": "clear sky"}]}
+
+# name, port, path, handler
+STUBS = [
+    ("flights", 8701, "/flights", flights),
+    ("hotels", 8702, "/hotels", hotels),
+    ("weather", 8703, "/data/2.5/weather", weather),
+]
+
+def make_server(name, path, handler):
+    delay = float(os.getenv(f"{name.upper()}_STUB_DELAY", "0"))
+
+    async def serve(reader, writer):
+        try:
+            # Keep-alive loop so pooled client connections are reused
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+
+                url = urlsplit(request_line.split()[1].decode())
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                if url.path == path:
+                    await asyncio.sleep(delay)
+                    status, body = "200 OK", json.dumps(handler(params)).encode()
+                else:
+                    status, body = "404 Not Found", b'{"error": "not found"}'
+
+                writer.write(
+                    f"HTTP/1.1 {status}\r\n"
+                    "Content-Type: application/json\r\n"
+                    f"Content-Length: {len(body)}\r\n"
+                    "\r\n".encode() + body
+                )
+                await writer.drain()
+        except (ConnectionError, IndexError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    return serve
+
+async def start_stub_servers(host="127.0.0.1"):
+    """Start every stub server and return them so callers can close them."""
+    servers = []
+    for name, port, path, handler in STUBS:
+        servers.append(await asyncio.start_server(make_server(name, path, handler), host, port))
+        logger.info(f"{name} stub listening on http://{host}:{port}")
+    return servers
+
+async def main():
+    servers = await start_stub_servers()
+    await asyncio.gather(*(server.serve_forever() for server in servers))
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+# The bot module reads its settings at import time
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(autouse=True)
+def ledger(tmp_path, monkeypatch):
+    """Give each test its own token ledger, flushed to a temporary file."""
+    import bot
+
+    test_ledger = bot.TokenLedger(
+        str(tmp_path / "token_ledger.json"),
+        bot.TOKEN_LEDGER_FLUSH_INTERVAL,
+        bot.DAILY_TOKEN_SOFT_QUOTA,
+        bot.DAILY_TOKEN_HARD_QUOTA,
+    )
+    monkeypatch.setattr(bot, "ledger", test_ledger)
+    return test_ledger
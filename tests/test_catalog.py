@@ -0,0 +1,58 @@
+import asyncio
+import os
+from types import SimpleNamespace
+
+from langchain_core.messages import AIMessage
+from langchain_openai import ChatOpenAI
+
+import bot
+
+EXAMPLE_CONFIG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bots.example.json")
+
+
+def test_example_config_loads(monkeypatch):
+    monkeypatch.setenv("TELEGRAM_BOT_TOKEN", "123:bali")
+    monkeypatch.setenv("LUXURY_BOT_TOKEN", "456:luxury")
+
+    bali, luxury = bot.load_bot_configs(EXAMPLE_CONFIG)
+
+    assert bali["catalog"] == {} and bali["prompt_template"] == bot.PROMPT_TEMPLATE
+    assert "{history}" in luxury["prompt_template"] and "{input}" in luxury["prompt_template"]
+    assert {"initial", "destinations_overview"} <= set(luxury["catalog"]["responses"])
+
+
+class FakeMessage:
+    message_id = 1
+
+    def __init__(self, text):
+        self.text = text
+        self.replies = []
+
+    async def reply_text(self, text, *args, **kwargs):
+        self.replies.append(text)
+        return self
+
+
+def test_typed_trip_request_uses_the_catalog_greeting(monkeypatch):
+    async def fake_ainvoke(self, prompt_value, *args, **kwargs):
+        return AIMessage(content="Noted.")
+
+    monkeypatch.setattr(ChatOpenAI, "ainvoke", fake_ainvoke)
+    monkeypatch.setattr(bot.prefetcher, "max_branches", 0)
+    catalog = {"responses": {"initial": "Welcome to Lisbon! When would you like to travel?"}}
+    message = FakeMessage("I want to plan a vacation")
+    update = SimpleNamespace(
+        message=message,
+        effective_message=message,
+        effective_user=SimpleNamespace(id=1),
+        effective_chat=SimpleNamespace(id=1),
+    )
+    context = SimpleNamespace(
+        user_data={},
+        chat_data={},
+        bot_data={"catalog": catalog},
+        application=SimpleNamespace(update_processor=bot.PerChatUpdateProcessor(1)),
+    )
+
+    assert asyncio.run(bot.handle_initial_query(update, context)) == bot.DESTINATION_DETAILS
+    assert message.replies == ["Welcome to Lisbon! When would you like to travel?"]
@@ -0,0 +1,41 @@
+import asyncio
+from types import SimpleNamespace
+
+from langchain_core.messages import AIMessage
+from langchain_openai import ChatOpenAI
+
+import bot
+
+
+def make_turn(user_id):
+    update = SimpleNamespace(effective_user=SimpleNamespace(id=user_id), message=None)
+    context = SimpleNamespace(user_data={"conversation": bot.setup_llm()}, chat_data={}, bot_data={})
+    return update, context
+
+
+def test_concurrent_identical_turns_share_one_upstream_call(monkeypatch):
+    calls = []
+
+    async def fake_ainvoke(self, prompt_value, *args, **kwargs):
+        calls.append(prompt_value.to_string())
+        await asyncio.sleep(0.05)
+        return AIMessage(content="Here are some dining options.")
+
+    monkeypatch.setattr(ChatOpenAI, "ainvoke", fake_ainvoke)
+
+    first, second = make_turn(1), make_turn(2)
+
+    async def run():
+        return await asyncio.gather(
+            bot.predict(*first, bot.CALLBACK_PROMPTS["dining"]),
+            bot.predict(*second, bot.CALLBACK_PROMPTS["dining"]),
+        )
+
+    answers = asyncio.run(run())
+
+    assert len(calls) == 1
+    assert answers == ["Here are some dining options."] * 2
+    # Each session still records the turn in its own memory
+    for _, context in (first, second):
+        assert len(context.user_data["conversation"].memory.chat_memory.messages) == 2
+
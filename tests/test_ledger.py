@@ -0,0 +1,91 @@
+import json
+import asyncio
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.messages import AIMessage
+from langchain_openai import ChatOpenAI
+
+import bot
+
+
+def make_ledger(tmp_path, data):
+    path = tmp_path / "token_ledger.json"
+    path.write_text(json.dumps(data))
+    return bot.TokenLedger(str(path), flush_interval=60, soft_quota=100, hard_quota=200)
+
+
+def test_load_restores_todays_counts(tmp_path):
+    counts = {"input_tokens": 90, "output_tokens": 20}
+    ledger = make_ledger(tmp_path, {"day": date.today().isoformat(), "total": counts, "users": {"7": counts}})
+    ledger.load()
+
+    assert ledger.total == counts
+    assert ledger.tier(7) == "economy"
+
+
+@pytest.mark.parametrize("data", [
+    [],
+    {"day": date.today().isoformat()},
+    {"day": date.today().isoformat(), "total": [], "users": {}},
+    {"day": date.today().isoformat(), "total": {"input_tokens": 1, "output_tokens": 1}, "users": {"7": 5}},
+    {"day": date.today().isoformat(), "total": {"input_tokens": "x", "output_tokens": 1}, "users": {}},
+])
+def test_malformed_ledger_starts_empty(tmp_path, data):
+    ledger = make_ledger(tmp_path, data)
+    ledger.load()
+
+    assert ledger.total == {"input_tokens": 0, "output_tokens": 0}
+    assert ledger.users == {}
+    assert ledger.tier(7) is None
+
+
+def make_turn(user_id):
+    update = SimpleNamespace(effective_user=SimpleNamespace(id=user_id), message=None)
+    context = SimpleNamespace(user_data={"conversation": bot.setup_llm()}, chat_data={}, bot_data={})
+    return update, context
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = []
+
+    async def fake_ainvoke(self, prompt_value, *args, **kwargs):
+        calls.append((self.model_name, self.max_tokens))
+        return AIMessage(
+            content="Here are some dining options.",
+            usage_metadata={"input_tokens": 400, "output_tokens": 100, "total_tokens": 500},
+        )
+
+    monkeypatch.setattr(ChatOpenAI, "ainvoke", fake_ainvoke)
+    return calls
+
+
+def test_turns_are_charged_to_the_user(ledger, calls):
+    update, context = make_turn(7)
+
+    asyncio.run(bot.predict(update, context, "Where should we eat in Ubud?"))
+
+    assert ledger.used_today(7) == 500
+    assert calls == [(bot.MODEL_ROUTES["quick"]["models"][0], bot.MODEL_ROUTES["quick"]["max_tokens"])]
+
+
+def test_over_the_soft_quota_uses_the_economy_route(ledger, calls):
+    ledger.record_user(7, {"input_tokens": ledger.soft_quota, "output_tokens": 0})
+    update, context = make_turn(7)
+
+    assert asyncio.run(bot.predict(update, context, "Where should we eat in Ubud?")) == "Here are some dining options."
+
+    economy = bot.MODEL_ROUTES[bot.ECONOMY_ROUTE]
+    assert calls == [(economy["models"][0], economy["max_tokens"])]
+
+
+def test_over_the_hard_quota_answers_from_the_catalog_only(ledger, calls):
+    ledger.record_user(7, {"input_tokens": ledger.hard_quota, "output_tokens": 0})
+    update, context = make_turn(7)
+
+    assert asyncio.run(bot.predict(update, context, "Where should we eat in Ubud?")) == bot.CATALOG_ONLY_RESPONSE
+
+    assert calls == []
+    assert context.user_data["conversation"].memory.chat_memory.messages == []
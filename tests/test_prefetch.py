@@ -0,0 +1,102 @@
+import asyncio
+from types import SimpleNamespace
+
+from langchain_core.messages import AIMessage
+from langchain_openai import ChatOpenAI
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+import bot
+
+
+def test_prefetch_survives_a_digest_and_predict_does_not_wait_for_one(monkeypatch):
+    calls = []
+
+    async def fake_ainvoke(self, prompt_value, *args, **kwargs):
+        calls.append(prompt_value.to_string())
+        return AIMessage(content="Here are some dining options.")
+
+    monkeypatch.setattr(ChatOpenAI, "ainvoke", fake_ainvoke)
+    markup = InlineKeyboardMarkup([[InlineKeyboardButton("Dining", callback_data="dining")]])
+
+    async def run():
+        update = SimpleNamespace(effective_user=SimpleNamespace(id=7), effective_chat=SimpleNamespace(id=7), message=None)
+        context = SimpleNamespace(
+            user_data={"conversation": bot.setup_llm()},
+            chat_data={},
+            bot_data={},
+            application=SimpleNamespace(update_processor=bot.PerChatUpdateProcessor(1)),
+        )
+        bot.prefetcher.schedule(update, context, markup)
+        await asyncio.sleep(0)
+
+        # A digest lands after the prefetch was built and another is still running
+        context.user_data["summary"] = "Planning a week in Bali."
+        slow_digest = asyncio.ensure_future(asyncio.sleep(10))
+        context.user_data["digest_task"] = slow_digest
+
+        answer = await asyncio.wait_for(bot.predict(update, context, bot.CALLBACK_PROMPTS["dining"]), 1)
+        slow_digest.cancel()
+        return answer
+
+    assert asyncio.run(run()) == "Here are some dining options."
+    assert len(calls) == 1
+
+
+def test_no_prefetch_while_a_tap_on_the_keyboard_is_in_flight(monkeypatch):
+    markup = InlineKeyboardMarkup([[InlineKeyboardButton("Dining", callback_data="dining")]])
+    update = SimpleNamespace(effective_user=SimpleNamespace(id=8), effective_chat=SimpleNamespace(id=8), message=None)
+    # A tap on the new keyboard is queued behind the update that sent it
+    processor = SimpleNamespace(taps_in_flight=lambda chat_id: {(5, "dining")})
+    context = SimpleNamespace(
+        user_data={"conversation": bot.setup_llm()},
+        chat_data={"keyboard_message_id": 5},
+        bot_data={},
+        application=SimpleNamespace(update_processor=processor),
+    )
+
+    bot.prefetcher.schedule(update, context, markup)
+
+    assert not context.user_data.get("prefetched")
+
+
+def test_concurrency_budget_counts_prefetches_not_yet_started(monkeypatch):
+    async def fake_ainvoke(self, prompt_value, *args, **kwargs):
+        await asyncio.sleep(0.01)
+        return AIMessage(content="Sure.")
+
+    monkeypatch.setattr(ChatOpenAI, "ainvoke", fake_ainvoke)
+    prefetcher = bot.Prefetcher(max_branches=3, max_concurrency=2, max_per_minute=60)
+    markup = InlineKeyboardMarkup([
+        [InlineKeyboardButton("Dining", callback_data="dining")],
+        [InlineKeyboardButton("Activities", callback_data="family_activities")],
+        [InlineKeyboardButton("Transport", callback_data="transportation")],
+    ])
+
+    def make_chat(chat_id):
+        update = SimpleNamespace(
+            effective_user=SimpleNamespace(id=chat_id), effective_chat=SimpleNamespace(id=chat_id), message=None
+        )
+        context = SimpleNamespace(
+            user_data={"conversation": bot.setup_llm()},
+            chat_data={},
+            bot_data={},
+            application=SimpleNamespace(update_processor=bot.PerChatUpdateProcessor(1)),
+        )
+        return update, context
+
+    async def run():
+        first, second = make_chat(21), make_chat(22)
+        # Two chats in the same event loop step, before any prefetch has started
+        prefetcher.schedule(*first, markup)
+        prefetcher.schedule(*second, markup)
+        scheduled = len(first[1].user_data["prefetched"]) + len(second[1].user_data["prefetched"])
+        running = prefetcher.running
+        prefetcher.cancel_all(first[1])
+        await asyncio.sleep(0.05)
+        return scheduled, running
+
+    scheduled, running = asyncio.run(run())
+
+    assert scheduled == running == 2
+    # Finished and cancelled prefetches both give their slot back
+    assert prefetcher.running == 0
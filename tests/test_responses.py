@@ -0,0 +1,79 @@
+import asyncio
+from types import SimpleNamespace
+
+import bot
+import stub_servers
+
+
+def test_section_goes_before_the_closing_question():
+    response = bot.add_before_question("Ubud is lovely.\n\nWant hotels?", "Weather: 82°F")
+    assert response == "Ubud is lovely.\n\nWeather: 82°F\n\nWant hotels?"
+
+
+def test_section_is_appended_to_a_single_paragraph_response():
+    response = bot.add_before_question("Ubud is lovely. Want hotels?", "Weather: 82°F")
+    assert response == "Ubud is lovely. Want hotels?\n\nWeather: 82°F"
+
+
+class FakeGateway:
+    sources = ["flights", "hotels", "weather"]
+
+    def __init__(self):
+        self.warmed = []
+
+    def warm(self, destination, sources):
+        self.warmed.extend(sources)
+
+    async def fetch(self, source, destination):
+        return stub_servers.FLIGHTS if source == "flights" else None
+
+
+class FakeMessage:
+    message_id = 1
+
+    def __init__(self):
+        self.replies = []
+
+    async def reply_text(self, text, *args, **kwargs):
+        self.replies.append(text)
+        return self
+
+
+class FakeQuery:
+    def __init__(self, message, data):
+        self.message = message
+        self.data = data
+
+    async def edit_message_text(self, *args, **kwargs):
+        pass
+
+
+def test_live_fares_are_added_to_the_flight_answer(monkeypatch):
+    gateway = FakeGateway()
+    monkeypatch.setattr(bot, "travel_data_gateway", gateway)
+    message = FakeMessage()
+    query = FakeQuery(message, "view_flights")
+    update = SimpleNamespace(
+        callback_query=query,
+        message=None,
+        effective_message=message,
+        effective_user=SimpleNamespace(id=1),
+        effective_chat=SimpleNamespace(id=1),
+    )
+    context = SimpleNamespace(
+        user_data={"conversation": bot.setup_llm(), "selected_destination": "ubud", "selected_resort": "maya_ubud"},
+        chat_data={},
+        bot_data={},
+        application=SimpleNamespace(update_processor=bot.PerChatUpdateProcessor(1)),
+    )
+
+    asyncio.run(bot.answer_button(update, context))
+
+    response = message.replies[-1]
+    assert "<b>Current fares:</b>\n1. <b>Singapore Airlines:</b>" in response
+    # The built-in answer's return legs, totals and options are kept
+    assert "Return: 7:30 AM" in response
+    assert "Combined with Maya Ubud Resort" in response
+    assert response.index("<b>Current fares:</b>") < response.index("Would you like to:")
+    # Only flights are waited for; the other sources load in the background
+    assert gateway.warmed == ["hotels", "weather"]
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage
+from langchain_openai import ChatOpenAI
+
+import bot
+
+
+def test_failed_calls_count_against_the_model(monkeypatch):
+    async def failing_ainvoke(self, prompt_value, *args, **kwargs):
+        raise TimeoutError("upstream timed out")
+
+    monkeypatch.setattr(ChatOpenAI, "ainvoke", failing_ainvoke)
+    router = bot.ModelRouter(bot.MODEL_ROUTES, bot.ROUTE_RULES, bot.DEFAULT_ROUTE)
+    route, llm = router.select("Where should we eat?")
+
+    for _ in range(bot.ROUTER_MIN_SAMPLES):
+        with pytest.raises(TimeoutError):
+            asyncio.run(router.invoke(route, llm, "Where should we eat?"))
+
+    assert router.p95(route, llm.model_name) >= bot.MODEL_ROUTES[route]["timeout"]
+    # The next request moves to the route's fallback model
+    assert router.select("Where should we eat?")[1].model_name != llm.model_name
+
+
+def test_each_route_sets_a_request_timeout():
+    router = bot.ModelRouter(bot.MODEL_ROUTES, bot.ROUTE_RULES, bot.DEFAULT_ROUTE)
+    for route, config in bot.MODEL_ROUTES.items():
+        assert router.select("hello", route)[1].request_timeout == config["timeout"]
+
+
+def test_cancelled_calls_leave_latency_alone(monkeypatch):
+    async def quick_ainvoke(self, prompt_value, *args, **kwargs):
+        await asyncio.sleep(0.2 if "slow" in prompt_value else 0)
+        return AIMessage(content="Sure.")
+
+    monkeypatch.setattr(ChatOpenAI, "ainvoke", quick_ainvoke)
+    router = bot.ModelRouter(bot.MODEL_ROUTES, bot.ROUTE_RULES, bot.DEFAULT_ROUTE)
+    route, llm = router.select("Where should we eat?")
+
+    async def run():
+        for _ in range(bot.ROUTER_MIN_SAMPLES):
+            await router.invoke(route, llm, "Where should we eat?")
+        before = router.p95(route, llm.model_name)
+        for _ in range(bot.ROUTER_MIN_SAMPLES):
+            # Like a prefetch the user didn't pick
+            task = asyncio.ensure_future(router.invoke(route, llm, "slow"))
+            await asyncio.sleep(0.01)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+        return before
+
+    before = asyncio.run(run())
+
+    assert router.p95(route, llm.model_name) == before
+    assert router.select("Where should we eat?")[1].model_name == llm.model_name
@@ -0,0 +1,44 @@
+import asyncio
+from types import SimpleNamespace
+
+import bot
+
+
+class FakeMessage:
+    async def reply_text(self, *args, **kwargs):
+        pass
+
+
+def test_start_clears_the_previous_trip():
+    async def run():
+        digest = asyncio.ensure_future(asyncio.sleep(10))
+        prefetch = asyncio.ensure_future(asyncio.sleep(10))
+        old_conversation = bot.setup_llm()
+        context = SimpleNamespace(
+            user_data={
+                "conversation": old_conversation,
+                "preferences": {"destination": "Ubud"},
+                "summary": "Asked about Ubud.",
+                "digested_upto": 12,
+                "digest_task": digest,
+                "prefetched": {"key": prefetch},
+            },
+            chat_data={},
+            bot_data={},
+        )
+        update = SimpleNamespace(
+            effective_user=SimpleNamespace(first_name="Ana", id=1),
+            message=FakeMessage(),
+        )
+
+        assert await bot.start(update, context) == bot.INITIAL
+        await asyncio.sleep(0)
+        return context, old_conversation, digest, prefetch
+
+    context, old_conversation, digest, prefetch = asyncio.run(run())
+
+    assert context.user_data["conversation"] is not old_conversation
+    assert set(context.user_data) == {"conversation"}
+    assert digest.cancelled() and prefetch.cancelled()
+    history = bot.render_history(context.user_data, context.user_data["conversation"].memory.chat_memory.messages)
+    assert history == ""
@@ -0,0 +1,72 @@
+import asyncio
+from datetime import datetime
+from itertools import count
+from types import SimpleNamespace
+
+from langchain_core.messages import AIMessage
+from langchain_openai import ChatOpenAI
+from telegram import CallbackQuery, Chat, Message, Update, User
+
+import bot
+
+CHAT = Chat(id=1, type="private")
+USER = User(id=1, first_name="Ana", is_bot=False)
+update_ids = count(1)
+
+
+def tap(message_id, data):
+    update_id = next(update_ids)
+    message = Message(message_id, datetime.now(), CHAT)
+    return Update(update_id, callback_query=CallbackQuery(str(update_id), USER, "chat", message=message, data=data))
+
+
+def test_repeated_taps_collapse_into_the_pending_answer(monkeypatch):
+    calls, notices, replies = [], {}, []
+
+    async def fake_ainvoke(self, prompt_value, *args, **kwargs):
+        calls.append(prompt_value)
+        await asyncio.sleep(0.05)
+        return AIMessage(content="Here are some dining options.")
+
+    async def answer(self, text=None, *args, **kwargs):
+        notices.setdefault(self.id, []).append(text)
+
+    async def edit_message_text(self, *args, **kwargs):
+        pass
+
+    async def reply_text(self, text, *args, **kwargs):
+        replies.append(text)
+        return Message(100 + len(replies), datetime.now(), CHAT)
+
+    monkeypatch.setattr(ChatOpenAI, "ainvoke", fake_ainvoke)
+    monkeypatch.setattr(CallbackQuery, "answer", answer)
+    monkeypatch.setattr(CallbackQuery, "edit_message_text", edit_message_text)
+    monkeypatch.setattr(Message, "reply_text", reply_text)
+    monkeypatch.setattr(bot.prefetcher, "max_branches", 0)
+    processor = bot.PerChatUpdateProcessor(8)
+    context = SimpleNamespace(
+        user_data={"conversation": bot.setup_llm()},
+        chat_data={"keyboard_message_id": 1},
+        bot_data={},
+        application=SimpleNamespace(update_processor=processor),
+    )
+
+    def process(update):
+        return processor.process_update(update, bot.button_callback(update, context))
+
+    first, second, third = tap(1, "dining"), tap(1, "dining"), tap(1, "dining")
+
+    async def run():
+        await asyncio.gather(process(first), process(second))
+        await process(third)
+
+    asyncio.run(run())
+
+    assert len(calls) == 1
+    assert len(replies) == 1
+    assert notices[first.callback_query.id] == [None]
+    # The second tap is answered straight away instead of queueing behind the first
+    assert notices[second.callback_query.id] == [bot.TAP_NOTICES["duplicate"]]
+    # A tap on an answer that was already sent is acknowledged silently
+    assert notices[third.callback_query.id] == [None]
+    assert not processor.taps_in_flight(CHAT.id)
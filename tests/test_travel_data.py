@@ -0,0 +1,64 @@
+import time
+import asyncio
+
+import bot
+import stub_servers
+from travel_data import TravelDataGateway
+
+
+def test_slow_source_is_dropped_within_its_timeout(monkeypatch):
+    monkeypatch.setenv("SKYSCANNER_BASE_URL", "http://127.0.0.1:8701")
+    monkeypatch.setenv("BOOKING_BASE_URL", "http://127.0.0.1:8702")
+    monkeypatch.setenv("OPENWEATHERMAP_BASE_URL", "http://127.0.0.1:8703")
+    monkeypatch.setenv("OPENWEATHERMAP_API_KEY", "stub")
+    monkeypatch.setenv("HOTELS_STUB_DELAY", "5")
+    monkeypatch.setenv("HOTELS_TIMEOUT", "1")
+
+    async def run():
+        servers = await stub_servers.start_stub_servers()
+        gateway = TravelDataGateway()
+        try:
+            start = time.monotonic()
+            results = await gateway.fetch_all("ubud")
+            return results, time.monotonic() - start
+        finally:
+            await gateway.close()
+            for server in servers:
+                server.close()
+
+    results, elapsed = asyncio.run(run())
+
+    assert results["hotels"] is None
+    assert results["flights"] == stub_servers.FLIGHTS
+    assert results["weather"] == {"temp": 82, "description": "clear sky"}
+    assert 0.9 <= elapsed < 2
+
+
+def test_a_reply_only_waits_for_the_source_it_shows(monkeypatch):
+    monkeypatch.setenv("SKYSCANNER_BASE_URL", "http://127.0.0.1:8701")
+    monkeypatch.setenv("BOOKING_BASE_URL", "http://127.0.0.1:8702")
+    monkeypatch.setenv("OPENWEATHERMAP_BASE_URL", "http://127.0.0.1:8703")
+    monkeypatch.setenv("OPENWEATHERMAP_API_KEY", "stub")
+    monkeypatch.setenv("HOTELS_STUB_DELAY", "5")
+
+    async def run():
+        servers = await stub_servers.start_stub_servers()
+        gateway = TravelDataGateway()
+        monkeypatch.setattr(bot, "travel_data_gateway", gateway)
+        try:
+            start = time.monotonic()
+            weather = await bot.fetch_travel_data("weather", "ubud")
+            elapsed = time.monotonic() - start
+            # Flights were fetched in the background meanwhile
+            await asyncio.sleep(0.2)
+            return weather, gateway._cache.get(("flights", "ubud"), (0, None))[1], elapsed
+        finally:
+            await gateway.close()
+            for server in servers:
+                server.close()
+
+    weather, flights, elapsed = asyncio.run(run())
+
+    assert weather == {"temp": 82, "description": "clear sky"}
+    assert flights == stub_servers.FLIGHTS
+    assert elapsed < 0.5
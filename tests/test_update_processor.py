@@ -0,0 +1,95 @@
+import time
+import asyncio
+from datetime import datetime
+
+from telegram import Chat, Message, MessageEntity, Update, User
+from telegram.constants import MessageEntityType
+from telegram.ext import Application, CommandHandler, ConversationHandler, ExtBot, MessageHandler, filters
+
+import bot
+
+
+def make_update(update_id, chat_id, text):
+    entities = [MessageEntity(MessageEntityType.BOT_COMMAND, 0, len(text))] if text.startswith("/") else None
+    message = Message(
+        update_id, datetime.now(), Chat(id=chat_id, type="private"),
+        from_user=User(id=chat_id, first_name="Ana", is_bot=False), text=text, entities=entities,
+    )
+    return Update(update_id, message=message)
+
+
+async def make_application(monkeypatch, seen):
+    async def get_me(self, *args, **kwargs):
+        self._bot_user = User(id=123, first_name="Travel", is_bot=True, username="travel_bot")
+        return self._bot_user
+
+    monkeypatch.setattr(ExtBot, "get_me", get_me)
+
+    async def start(update, context):
+        await asyncio.sleep(0.05)
+        seen.append((update.effective_chat.id, "start"))
+        return bot.INITIAL
+
+    async def query(update, context):
+        seen.append((update.effective_chat.id, "query"))
+        return bot.INITIAL
+
+    application = Application.builder().token("123:test-token").build()
+    application.add_handler(ConversationHandler(
+        entry_points=[CommandHandler("start", start)],
+        states={bot.INITIAL: [MessageHandler(filters.TEXT & ~filters.COMMAND, query)]},
+        fallbacks=[],
+    ))
+    await application.initialize()
+    return application
+
+
+def process(processor, application, update):
+    update.set_bot(application.bot)
+    update.message.set_bot(application.bot)
+    return processor.process_update(update, application.process_update(update))
+
+
+def test_a_chats_updates_are_routed_in_order(monkeypatch):
+    seen = []
+
+    async def run():
+        application = await make_application(monkeypatch, seen)
+        processor = bot.PerChatUpdateProcessor(8)
+        await asyncio.gather(
+            process(processor, application, make_update(1, 1, "/start")),
+            process(processor, application, make_update(2, 1, "I want a beach vacation")),
+        )
+
+    asyncio.run(run())
+
+    # The message is routed on the state /start left, not dropped
+    assert seen == [(1, "start"), (1, "query")]
+
+
+def test_different_chats_are_processed_in_parallel(monkeypatch):
+    seen = []
+
+    async def run():
+        application = await make_application(monkeypatch, seen)
+        processor = bot.PerChatUpdateProcessor(8)
+        began = time.monotonic()
+        await asyncio.gather(
+            process(processor, application, make_update(1, 1, "/start")),
+            process(processor, application, make_update(2, 2, "/start")),
+            process(processor, application, make_update(3, 3, "/start")),
+        )
+        return processor, time.monotonic() - began
+
+    processor, elapsed = asyncio.run(run())
+
+    assert sorted(seen) == [(1, "start"), (2, "start"), (3, "start")]
+    # Three 50ms handlers overlap instead of taking 150ms
+    assert elapsed < 0.12
+    # Locks of idle chats are not kept around
+    assert not processor._locks
+
+
+def test_bots_process_updates_per_chat():
+    application = bot.build_application("123:test-token")
+    assert isinstance(application.update_processor, bot.PerChatUpdateProcessor)
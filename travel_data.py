@@ -0,0 +1,189 @@
+import os
+import time
+import asyncio
+import logging
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# How long a failed or timed-out lookup is remembered before the source is retried
+FAILURE_TTL = 30
+
+# Airport and weather lookup for each destination the bot offers
+DESTINATIONS = {
+    "ubud": {"airport": "DPS", "city": "Ubud,ID"},
+    "seminyak": {"airport": "DPS", "city": "Seminyak,ID"},
+    "uluwatu": {"airport": "DPS", "city": "Uluwatu,ID"},
+}
+
+# Per-source settings, read when the gateway is created so .env has been loaded.
+# Flights and hotels are read from a service returning the normalized JSON served
+# by stub_servers.py, so they are only enabled when a base URL is configured.
+# Weather uses the OpenWeatherMap current weather API.
+def load_sources():
+    return {
+        "flights": {
+            "base_url": os.getenv("SKYSCANNER_BASE_URL"),
+            "api_key": os.getenv("SKYSCANNER_API_KEY"),
+            "timeout": float(os.getenv("FLIGHTS_TIMEOUT", "4.0")),
+            "ttl": 600,
+        },
+        "hotels": {
+            "base_url": os.getenv("BOOKING_BASE_URL"),
+            "api_key": os.getenv("BOOKING_API_KEY"),
+            "timeout": float(os.getenv("HOTELS_TIMEOUT", "4.0")),
+            "ttl": 1800,
+        },
+        "weather": {
+            "base_url": os.getenv("OPENWEATHERMAP_BASE_URL", "https://api.openweathermap.org"),
+            "api_key": os.getenv("OPENWEATHERMAP_API_KEY"),
+            "timeout": float(os.getenv("WEATHER_TIMEOUT", "2.0")),
+            "ttl": 600,
+        },
+    }
+
+def build_request(source, destination):
+    """Return the path and query parameters for one source and destination."""
+    place = DESTINATIONS[destination]
+    # Trip defaults matching the conversation flow
+    depart = os.getenv("TRAVEL_DEPART_DATE", "2025-06-15")
+    return_date = os.getenv("TRAVEL_RETURN_DATE", "2025-06-22")
+    travelers = int(os.getenv("TRAVEL_PARTY_SIZE", "3"))
+    if source == "flights":
+        return "/flights", {
+            "origin": os.getenv("TRAVEL_ORIGIN_AIRPORT", "ORD"),
+            "destination": place["airport"],
+            "depart": depart,
+            "return": return_date,
+            "adults": travelers,
+        }
+    if source == "hotels":
+        return "/hotels", {
+            "area": destination,
+            "checkin": depart,
+            "checkout": return_date,
+            "guests": travelers,
+        }
+    return "/data/2.5/weather", {"q": place["city"], "units": "imperial"}
+
+def parse_response(source, data):
+    """Reduce a source's JSON payload to what the bot renders."""
+    if source == "flights":
+        return data["flights"]
+    if source == "hotels":
+        return data["hotels"]
+    return {
+        "temp": round(data["main"]["temp"]),
+        "description": data["weather"][0]["description"],
+    }
+
+class TravelDataGateway:
+    """Fetch flights, hotels and weather over one pooled HTTP client."""
+
+    def __init__(self, sources=None, max_connections=20):
+        self.sources = sources or load_sources()
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+        )
+        self._cache = {}
+        self._pending = {}
+
+    def enabled(self, source):
+        config = self.sources[source]
+        if source == "weather":
+            return bool(config["api_key"])
+        return bool(config["base_url"])
+
+    async def _get(self, source, destination):
+        config = self.sources[source]
+        path, params = build_request(source, destination)
+        if config["api_key"]:
+            # OpenWeatherMap names its key parameter "appid"
+            params["appid" if source == "weather" else "apikey"] = config["api_key"]
+        response = await self.client.get(
+            config["base_url"].rstrip("/") + path,
+            params=params,
+            timeout=config["timeout"],
+        )
+        response.raise_for_status()
+        return parse_response(source, response.json())
+
+    def _fresh(self, key):
+        cached = self._cache.get(key)
+        return cached is not None and cached[0] > time.monotonic()
+
+    def _lookup(self, source, destination):
+        """Return the lookup under way for a source, starting one if there is none."""
+        key = (source, destination)
+        task = self._pending.get(key)
+        if task is None:
+            task = self._pending[key] = asyncio.ensure_future(self._load(source, destination))
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+        return task
+
+    async def fetch(self, source, destination):
+        """Return one source's data for a destination, or None if unavailable."""
+        if destination not in DESTINATIONS or not self.enabled(source):
+            return None
+
+        key = (source, destination)
+        if self._fresh(key):
+            return self._cache[key][1]
+        # Shared, so a caller giving up doesn't cancel the lookup for the others
+        return await asyncio.shield(self._lookup(source, destination))
+
+    def warm(self, destination, sources):
+        """Start looking up sources in the background so later replies find them cached."""
+        if destination not in DESTINATIONS:
+            return
+        for source in sources:
+            if self.enabled(source) and not self._fresh((source, destination)):
+                self._lookup(source, destination)
+
+    async def _load(self, source, destination):
+        config = self.sources[source]
+        try:
+            # Bound the whole call, not just each network phase, so a slow source
+            # can't hold up the others
+            result = await asyncio.wait_for(self._get(source, destination), config["timeout"])
+            ttl = config["ttl"]
+        except (asyncio.TimeoutError, httpx.TimeoutException):
+            logger.warning(f"{source} lookup for {destination} timed out")
+            result, ttl = None, FAILURE_TTL
+        except (httpx.HTTPError, KeyError, IndexError, ValueError) as e:
+            logger.warning(f"{source} lookup for {destination} failed: {e!r}")
+            result, ttl = None, FAILURE_TTL
+
+        self._cache[(source, destination)] = (time.monotonic() + ttl, result)
+        return result
+
+    async def fetch_all(self, destination):
+        """Fetch every source concurrently; slow or failing sources come back as None."""
+        names = list(self.sources)
+        results = await asyncio.gather(*(self.fetch(name, destination) for name in names))
+        return dict(zip(names, results))
+
+    async def close(self):
+        for task in list(self._pending.values()):
+            task.cancel()
+        await self.client.aclose()
+
+# Rendering helpers for gateway results
+def format_flights(flights):
+    lines = []
+    for i, flight in enumerate(flights, 1):
+        lines.append(
+            f"{i}. <b>{flight['airline']}:</b> ${flight['price']:,}/person round trip ({flight['stops']})\n"
+            f"   • Depart: {flight['depart']}, Arrive: {flight['arrive']}"
+        )
+    return "\n\n".join(lines)
+
+def format_hotels(hotels):
+    return "\n".join(f"• {hotel['name']} - ${hotel['price_total']:,} total" for hotel in hotels)
+
+def format_weather(weather):
+    return f"{weather['temp']}°F, {weather['description']}"